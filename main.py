@@ -1,68 +1,97 @@
+import importlib
 import sys
+from functools import cache
+from urllib.parse import unquote_plus
 
 import xbmcaddon
 import xbmcgui
 import xbmcplugin
 
-try:
-    from urlparse import parse_qsl  # type: ignore
-except ImportError:
-    from urllib.parse import parse_qsl  # type: ignore
-
-from resources.lib.api import DAFilmsAPI
 from resources.lib.utils import get_url
-from resources.lib.films import list_newest_films, list_subscription_films, list_purchased_films
-from resources.lib.search import perform_search
-from resources.lib.playback import play_film
 
 if len(sys.argv) > 1:
     _handle = int(sys.argv[1])
 
 
+# Main menu entries as (label, action)
+_MENU = (
+    ("Zakoupené filmy", "list_purchased_films"),
+    ("Filmy pro předplatitele", "list_subscription_films"),
+    ("Nejnovější filmy", "list_newest"),
+    ("Hledat", "search"),
+)
+
+
+@cache
+def _menu_urls():
+    """Main menu entries as (label, url), encoded on first use only"""
+    return tuple((label, get_url(action=action, label=label)) for label, action in _MENU)
+
+
 def list_menu():
     """Main menu listing"""
-    # Purchased films
-    list_item = xbmcgui.ListItem(label="Zakoupené filmy")
-    url = get_url(action="list_purchased_films", label="Zakoupené filmy")
-    xbmcplugin.addDirectoryItem(_handle, url, list_item, True)
-
-    # Subscription films
-    list_item = xbmcgui.ListItem(label="Filmy pro předplatitele")
-    url = get_url(action="list_subscription_films", label="Filmy pro předplatitele")
-    xbmcplugin.addDirectoryItem(_handle, url, list_item, True)
-
-    # Featured content
-    list_item = xbmcgui.ListItem(label="Nejnovější filmy")
-    url = get_url(action="list_newest", label="Nejnovější filmy")
-    xbmcplugin.addDirectoryItem(_handle, url, list_item, True)
-
-    # Search
-    list_item = xbmcgui.ListItem(label="Hledat")
-    url = get_url(action="search", label="Hledat")
-    xbmcplugin.addDirectoryItem(_handle, url, list_item, True)
-
+    items = [(url, xbmcgui.ListItem(label=label), True) for label, url in _menu_urls()]
+    xbmcplugin.addDirectoryItems(_handle, items, len(items))
     xbmcplugin.endOfDirectory(_handle, cacheToDisc=True)
 
 
+# Action handlers, keyed by the "action" URL parameter, as (module, function, argument
+# getter). Handler modules are imported on dispatch so each call only loads what it uses.
+_ACTIONS = {
+    "list_newest": (
+        "resources.lib.films",
+        "list_newest_films",
+        lambda params: (params["label"],),
+    ),
+    "list_subscription_films": (
+        "resources.lib.films",
+        "list_subscription_films",
+        lambda params: (params["label"],),
+    ),
+    "list_purchased_films": (
+        "resources.lib.films",
+        "list_purchased_films",
+        lambda params: (params["label"],),
+    ),
+    "search": (
+        "resources.lib.search",
+        "perform_search",
+        lambda params: (params.get("query", ""), params["label"]),
+    ),
+    "play_film": (
+        "resources.lib.playback",
+        "play_film",
+        lambda params: (params["film_id"], params["title"]),
+    ),
+}
+
+
+def _parse_params(paramstring):
+    """Parse a plugin query string into a dict, skipping blank values like parse_qsl"""
+    params = {}
+    for pair in paramstring.split("&"):
+        key, _, value = pair.partition("=")
+        if value:
+            params[unquote_plus(key)] = unquote_plus(value)
+    return params
+
+
 def router(paramstring):
     """Route plugin calls to appropriate functions"""
-    params = dict(parse_qsl(paramstring))
+    params = _parse_params(paramstring)
 
     if not params:
         list_menu()
-    elif params["action"] == "list_newest":
-        list_newest_films(params["label"])
-    elif params["action"] == "list_subscription_films":
-        list_subscription_films(params["label"])
-    elif params["action"] == "list_purchased_films":
-        list_purchased_films(params["label"])
-    elif params["action"] == "search":
-        perform_search(params.get("query", ""), params["label"])
-    elif params["action"] == "play_film":
-        play_film(params["film_id"], params["title"])
-    else:
+        return
+
+    action = _ACTIONS.get(params["action"])
+    if action is None:
         raise ValueError(f"Unknown parameter: {paramstring}!")
 
+    module_name, function_name, get_args = action
+    handler = getattr(importlib.import_module(module_name), function_name)
+    handler(*get_args(params))
+
 
 if __name__ == "__main__":
     router(sys.argv[2][1:])
@@ -1,10 +1,262 @@
+import io
 import json
+import logging
 import re
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import asdict, dataclass
+from itertools import islice
 from typing import Any
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+from resources.lib.cache import DAFilmsCache
+
+_log = logging.getLogger("dafilms.api")
+
+try:
+    # Optional C-backed JSON parser, several times faster on large player responses
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+try:
+    # Optional C-backed parser, much faster than BeautifulSoup on listing pages
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    # Optional incremental parser, stops reading listing pages after the last card needed
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Patterns for thumbnails in card styles and stream sources in the player configuration
+_THUMB_RE = re.compile(r"url\(['\"]([^'\"]+)['\"]\)")
+_SOURCES_RE = re.compile(r"sources\s*=\s*\[([^\]]+)\]", re.DOTALL)
+_SOURCE_OBJ_RE = re.compile(r"\{[^}]+\}")
+_SRC_RE = re.compile(r'"src"\s*:\s*"([^"]+)"')
+_LABEL_RE = re.compile(r'"label"\s*:\s*"([^"]+)"')
+_SOURCE_MP4_RE = re.compile(r'https[^"\s]+\.mp4')
+_MP4_RE = re.compile(r'https?://[^"\'\s,&]+\.mp4')
+_STREAM_HINT_RE = re.compile(r"\.(?:mp4|m3u8)\b")
+_RESOLUTION_RE = re.compile(r"(?<!\d)(\d{3,4})p\b")
+
+STREAM_URL_PREFIXES = ("http://", "https://")
+
+# Markers of a logged in (logout link) and logged out (login link) page, found in one scan
+_LOGGED_IN_MARKERS = frozenset(("Odhlásit", "logout"))
+_LOGIN_MARKERS_RE = re.compile("Odhlásit|logout|Přihlásit|login")
+
+# JSON-LD clean-up: drop newlines, tabs and other ASCII control characters (whitespace
+# ones are kept for the later split), normalize spaces, dashes and typographic quotes
+_JSONLD_TRANS = str.maketrans(
+    {
+        "\n": None,
+        "\r": None,
+        "\t": None,
+        "\u00a0": " ",  # Non-breaking space
+        "\u2013": "-",  # En dash
+        "\u201c": '"',  # Left double quote
+        "\u201d": '"',  # Right double quote
+        **{chr(c): None for c in (*range(32), 127) if not chr(c).isspace()},
+    }
+)
+
+
+def _clean_json_text(text: str) -> str:
+    """Remove control characters, fix common typographic issues and normalize whitespace"""
+    clean_string = text.translate(_JSONLD_TRANS)
+    # Remove any other non-printable characters, rarely present
+    if not clean_string.isprintable():
+        clean_string = "".join(ch for ch in clean_string if ch.isprintable() or ch.isspace())
+    return " ".join(clean_string.split())
+
+
+def _login_state(html: str) -> bool | None:
+    """True if the page has a logout link, False if only a login link and None if neither"""
+    logged_out = None
+    for match in _LOGIN_MARKERS_RE.finditer(html):
+        if match.group() in _LOGGED_IN_MARKERS:
+            return True
+        logged_out = False
+    return logged_out
+
+
+def _resolution(url: str) -> int:
+    """Vertical resolution from a stream URL like ...-720p.mp4, 0 if unknown"""
+    match = _RESOLUTION_RE.search(url)
+    return int(match.group(1)) if match else 0
+
+
+def _find_stream(node: Any) -> str | None:
+    """Find the first stream URL in nested JSON data, breadth first"""
+    queue = deque([node])
+    while queue:
+        node = queue.popleft()
+        if isinstance(node, dict):
+            queue.extend(node.values())
+        elif isinstance(node, list):
+            queue.extend(node)
+        elif (
+            isinstance(node, str)
+            and node.startswith(STREAM_URL_PREFIXES)
+            and _STREAM_HINT_RE.search(node)
+        ):
+            # Only whole URLs, not HTML snippets that merely embed one
+            return node
+    return None
+
+
+def _parse_json_ld(json_string: str) -> tuple[Any, bool]:
+    """Parse JSON-LD, cleaning it up only when it is not valid JSON
+
+    Returns the data and whether its text still holds raw control characters.
+    """
+    try:
+        return _json_loads(json_string), False
+    except ValueError:
+        pass
+    # Raw control characters are commonly present, strict=False tolerates them
+    try:
+        return json.loads(json_string, strict=False), True
+    except ValueError:
+        pass
+    try:
+        return json.loads(_clean_json_text(json_string), strict=False), False
+    except ValueError:
+        return None, False
+
+
+# Prefer the C-based lxml parser, fall back to the pure-Python one where lxml is missing
+_PARSER = "lxml" if builder_registry.lookup("lxml") else "html.parser"
+
+# Only build the tree for the page fragments we actually read
+_FILM_STRAINER = SoupStrainer("li", attrs={"data-film-item": "true"})
+# Strainers see the unsplit class attribute, so match the class as a whole word
+_PAYMENTS_STRAINER = SoupStrainer("table", class_=re.compile(r"\btable-responsive\b"))
+_JSONLD_STRAINER = SoupStrainer("script", {"type": "application/ld+json"})
+
+
+def _soup(html_content: str, parse_only: SoupStrainer | None = None) -> BeautifulSoup:
+    """Parse HTML with the fastest available parser, optionally restricted to matching elements"""
+    return BeautifulSoup(html_content, _PARSER, parse_only=parse_only)
+
+
+def _class_xpath(path: str, class_name: str):
+    """Compile an XPath matching elements by one of their classes"""
+    return etree.XPath(
+        f'{path}[contains(concat(" ", normalize-space(@class), " "), " {class_name} ")][1]'
+    )
+
+
+if etree is not None:
+    _LINK_XPATH = _class_xpath(".//a", "ui-movie-card__link")
+    _LINK_TITLE_XPATH = _class_xpath(".//*", "ui-movie-card__link--title")
+    _TITLE_XPATH = _class_xpath(".//*", "ui-movie-card__title")
+    _IMG_XPATH = etree.XPath(".//img[1]")
+
+
+def _iter_film_cards_lxml(html_content: str):
+    """Yield film cards like _iter_film_cards, parsing the page only as far as it is consumed"""
+    cards = etree.iterparse(
+        io.BytesIO(html_content.encode("utf-8")), tag="li", html=True, encoding="utf-8"
+    )
+    for _event, card in cards:
+        if card.get("data-film-item") != "true":
+            continue
+
+        link_elements = _LINK_XPATH(card)
+        if link_elements:
+            title_elements = _LINK_TITLE_XPATH(card) or _TITLE_XPATH(card)
+            img_elements = _IMG_XPATH(card)
+            yield (
+                link_elements[0].get("href"),
+                "".join(text.strip() for text in title_elements[0].itertext())
+                if title_elements
+                else None,
+                link_elements[0].get("style"),
+                img_elements[0].get("src") if img_elements else None,
+            )
+
+        # Parsed cards are no longer needed
+        card.clear(keep_tail=True)
+
+
+def _iter_film_cards(html_content: str):
+    """Yield (href, title, style, img_src) for each film card with a link on a listing page"""
+    if HTMLParser is not None:
+        for card in HTMLParser(html_content).css('li[data-film-item="true"]'):
+            link_element = card.css_first("a.ui-movie-card__link")
+            if link_element is None:
+                continue
+
+            title_element = card.css_first(".ui-movie-card__link--title")
+            if title_element is None:
+                title_element = card.css_first(".ui-movie-card__title")
+
+            img_element = card.css_first("img")
+            yield (
+                link_element.attributes["href"],
+                title_element.text(strip=True) if title_element is not None else None,
+                link_element.attributes.get("style"),
+                img_element.attributes.get("src") if img_element is not None else None,
+            )
+        return
+
+    if etree is not None:
+        parsed = 0
+        try:
+            for film_card in _iter_film_cards_lxml(html_content):
+                yield film_card
+                parsed += 1
+            return
+        except etree.LxmlError:
+            # Let BeautifulSoup parse what lxml can't, continuing after the cards already seen
+            yield from islice(_iter_film_cards_soup(html_content), parsed, None)
+            return
+
+    yield from _iter_film_cards_soup(html_content)
+
+
+def _iter_film_cards_soup(html_content: str):
+    """Yield film cards like _iter_film_cards using BeautifulSoup"""
+    for card in _soup(html_content, _FILM_STRAINER).find_all(
+        "li", attrs={"data-film-item": "true"}
+    ):
+        link_element = card.find("a", class_="ui-movie-card__link")
+        if not link_element:
+            continue
+
+        title_element = card.find(class_="ui-movie-card__link--title")
+        if not title_element:
+            title_element = card.find(class_="ui-movie-card__title")
+
+        img_element = card.find("img")
+        yield (
+            link_element["href"],
+            title_element.get_text(strip=True) if title_element else None,
+            link_element.get("style"),
+            img_element.get("src") if img_element else None,
+        )
+
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTP adapter applying a default timeout, requests has none on the session level"""
+
+    def __init__(self, *args, timeout: float, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
 
 
 @dataclass
@@ -30,15 +282,50 @@ class DAFilmsAPI:
     # Based on research, the site uses HTML scraping rather than a public API
     # We'll need to parse HTML content
 
-    def __init__(self):
+    # How long cached data stays fresh, in seconds
+    FILM_DETAILS_TTL = 7 * 24 * 60 * 60
+    LISTING_TTL = 10 * 60
+    # CloudFront signs stream URLs for much longer than we reuse them
+    STREAM_URL_TTL = 5 * 60
+    # Seconds to wait for the CDN when checking a cached stream URL
+    STREAM_CHECK_TIMEOUT = 5.0
+
+    # Symfony cookie set by a login with remember_me enabled
+    REMEMBER_ME_COOKIE = "REMEMBERME"
+
+    # Seconds to wait for the server before giving up on a request
+    REQUEST_TIMEOUT = 15.0
+
+    def __init__(self, cache: DAFilmsCache | None = None):
+        self.cache = cache
         self.session = requests.Session()
         self.session.headers.update(
             {
                 "User-Agent": "Kodi/DAFilms Addon",
                 "Accept": "application/json",
+                # Every compression the installed urllib3 can decode (brotli when available)
+                "Accept-Encoding": ACCEPT_ENCODING,
             }
         )
+
+        # Keep connections alive across calls, retry transient server errors and never hang
+        adapter = _TimeoutHTTPAdapter(
+            timeout=self.REQUEST_TIMEOUT,
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET", "POST"]),
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self._logged_in = False
+        # Account of the last successful login, stream URLs are cached per account
+        self._account = None
         self._csrf_token = None
 
     def get_newest_films(self, page: int = 1, limit: int = 20) -> list[FilmDetails]:
@@ -54,11 +341,7 @@ class DAFilmsAPI:
         try:
             # Use the SVOD collection URL
             url = f"{self.BASE_URL}/collection/35-svod-covered"
-            response = self.session.get(url)
-            response.raise_for_status()
-
-            # Reuse the existing film parsing logic
-            return self._parse_films_from_page(response.text, limit)
+            return self._get_listing(url, limit)
         except requests.RequestException as e:
             raise DAFilmsAPIError(f"Network error fetching subscription films: {str(e)}") from e
 
@@ -70,8 +353,8 @@ class DAFilmsAPI:
             response = self.session.get(payments_url)
             response.raise_for_status()
 
-            # Parse the payments table to find purchased films
-            soup = BeautifulSoup(response.text, "html.parser")
+            # Parse only the payments table to find purchased films
+            soup = _soup(response.text, _PAYMENTS_STRAINER)
 
             # Find the payments table
             payments_table = soup.find("table", class_="table-responsive")
@@ -84,11 +367,12 @@ class DAFilmsAPI:
             )
 
             purchased_films = []
+            seen_ids: set[str] = set()
 
             # Parse each row to find "Stažení filmu" entries
             for row in rows:
-                # Find the purpose column (second column)
-                columns = row.find_all("td")
+                # Find the purpose column (second column), stop looking after it
+                columns = row.find_all("td", limit=2)
                 if len(columns) >= 2:
                     purpose_cell = columns[1]
 
@@ -105,7 +389,8 @@ class DAFilmsAPI:
                             film_id = film_url.split("/film/")[-1].split("/")[0]
 
                             # Avoid duplicates
-                            if film_id not in [f.id for f in purchased_films]:
+                            if film_id not in seen_ids:
+                                seen_ids.add(film_id)
                                 film_details = FilmDetails(
                                     id=film_id,
                                     title=film_link.get_text(strip=True),
@@ -123,43 +408,27 @@ class DAFilmsAPI:
 
     def _parse_films_from_page(self, html_content: str, limit: int = 50) -> list[FilmDetails]:
         """Internal method to parse films from HTML page content"""
-        soup = BeautifulSoup(html_content, "html.parser")
         films = []
 
-        # Find all film card elements - same structure as other listings
-        film_cards = soup.find_all("li", attrs={"data-film-item": "true"})
-
-        for card in film_cards:
-            # Find the main link element
-            link_element = card.find("a", class_="ui-movie-card__link")
-            if not link_element:
-                continue
-
-            film_url = link_element["href"]
+        # Film cards share the same structure across all listings
+        for film_url, title, style, img_src in _iter_film_cards(html_content):
             if not film_url.startswith("http"):
                 film_url = f"{self.BASE_URL}{film_url}"
 
             film_id = film_url.split("/film/")[-1].split("/")[0]
 
-            # Extract title
-            title_element = card.find(class_="ui-movie-card__link--title")
-            if not title_element:
-                title_element = card.find(class_="ui-movie-card__title")
-
-            title = title_element.get_text(strip=True) if title_element else "Unknown Title"
+            if title is None:
+                title = "Unknown Title"
 
             # Extract thumbnail
             thumb = None
-            if link_element.has_attr("style"):
-                style = link_element["style"]
-                match = re.search(r"url\(['\"]([^'\"]+)['\"]\)", style)
+            if style is not None:
+                match = _THUMB_RE.search(style)
                 if match:
                     thumb = match.group(1)
 
             if not thumb:
-                img_element = card.find("img")
-                if img_element and img_element.has_attr("src"):
-                    thumb = img_element["src"]
+                thumb = img_src
 
             films.append(FilmDetails(film_id, title, film_url, thumb))
 
@@ -184,14 +453,27 @@ class DAFilmsAPI:
             else:
                 url = f"{self.BASE_URL}/film"
 
-            response = self.session.get(url)
-            response.raise_for_status()
-
-            # Reuse the common film parsing logic
-            return self._parse_films_from_page(response.text, limit)
+            return self._get_listing(url, limit)
         except requests.RequestException as e:
             raise DAFilmsAPIError(f"Network error fetching films: {str(e)}") from e
 
+    def _get_listing(self, url: str, limit: int) -> list[FilmDetails]:
+        """Internal method to fetch and parse a listing page, served from cache while fresh"""
+        key = f"{url}#{limit}"
+        if self.cache is not None:
+            cached = self.cache.get(key, self.LISTING_TTL)
+            if cached is not None:
+                return [FilmDetails(**film) for film in cached]
+
+        response = self.session.get(url)
+        response.raise_for_status()
+
+        # Reuse the common film parsing logic
+        films = self._parse_films_from_page(response.text, limit)
+        if self.cache is not None:
+            self.cache.set(key, [asdict(film) for film in films])
+        return films
+
     def search_films(self, query: str, page: int = 1) -> list[FilmDetails]:
         """Search for films using the film search endpoint"""
         try:
@@ -205,52 +487,58 @@ class DAFilmsAPI:
             raise DAFilmsAPIError(f"Network error searching films: {str(e)}") from e
 
     def get_film_details(self, film_id: str) -> dict[str, Any]:
-        """Get details for a specific film by parsing the film page"""
+        """Get details for a specific film by parsing the film page, cached for a week"""
+        key = f"film/{film_id}"
+        if self.cache is not None:
+            details = self.cache.get(key, self.FILM_DETAILS_TTL)
+            if details is not None:
+                return details
+
         try:
             response = self.session.get(f"{self.BASE_URL}/film/{film_id}")
             response.raise_for_status()
 
             # Extract JSON-LD data which contains structured film information
             # Look for Movie type JSON-LD specifically, as there may be multiple JSON-LD scripts
-            soup = BeautifulSoup(response.text, "html.parser")
+            soup = _soup(response.text, _JSONLD_STRAINER)
             json_ld_scripts = soup.find_all("script", {"type": "application/ld+json"})
             film_data = None
+            needs_cleanup = False
 
             for script in json_ld_scripts:
-                # Try to clean up the JSON string and parse again
-                try:
-                    # Remove control characters and fix common issues
-                    clean_string = (
-                        script.string.replace("\n", "")
-                        .replace("\r", "")
-                        .replace("\t", "")
-                        .replace("\u00a0", " ")  # Replace non-breaking spaces
-                        .replace("\u2013", "-")  # Replace en dash
-                        .replace("\u201c", '"')  # Replace left double quote
-                        .replace("\u201d", '"')  # Replace right double quote
-                    )
-                    # Remove other control characters
-                    clean_string = "".join(
-                        ch for ch in clean_string if ch.isprintable() or ch.isspace()
-                    )
-                    clean_string = " ".join(clean_string.split())  # Normalize whitespace
-                    data = json.loads(clean_string)
-                    if data.get("@type") == "Movie":
-                        film_data = data
-                        break
-                except Exception:
+                json_string = script.string
+                # Skip other JSON-LD types without decoding them
+                if not json_string or '"Movie"' not in json_string:
                     continue
 
-            details = {
-                "title": film_data.get("name", ""),
-                "plot": film_data.get("description", ""),
-                "director": film_data.get("director", [{}])[0].get("name")
+                # orjson rejects str subclasses like bs4's NavigableString
+                data, needs_cleanup = _parse_json_ld(str(json_string))
+                if isinstance(data, dict) and data.get("@type") == "Movie":
+                    film_data = data
+                    break
+
+            # Decoded text is kept as is, escaped newlines included, unless raw
+            # control characters came through with it
+            clean = _clean_json_text if needs_cleanup else str
+
+            director = (
+                film_data.get("director", [{}])[0].get("name")
                 if film_data.get("director")
-                else None,
-                "cast": [actor.get("name") for actor in film_data.get("actor", [])],
+                else None
+            )
+            details = {
+                "title": clean(film_data.get("name", "")),
+                "plot": clean(film_data.get("description", "")),
+                "director": clean(director) if director else director,
+                "cast": [
+                    clean(name) if name else name
+                    for name in (actor.get("name") for actor in film_data.get("actor", []))
+                ],
                 "thumb": film_data.get("image"),
             }
 
+            if self.cache is not None:
+                self.cache.set(key, details)
             return details
 
         except requests.RequestException as e:
@@ -286,6 +574,51 @@ class DAFilmsAPI:
             return False
 
     def get_stream_url(self, film_id: str) -> str:
+        """Get stream URL for a film, reusing one resolved in the last few minutes"""
+        key = self._stream_key(film_id)
+        if self.cache is not None:
+            stream_url = self.cache.get(key, self.STREAM_URL_TTL)
+            if stream_url is not None:
+                if self._stream_available(stream_url):
+                    return stream_url
+                # Expired or revoked, resolve a fresh one
+                self.invalidate_stream(film_id)
+
+        stream_url = self._fetch_stream_url(film_id)
+        # Only remember playable URLs, access may change after a purchase
+        if (
+            self.cache is not None
+            and isinstance(stream_url, str)
+            and stream_url.startswith(STREAM_URL_PREFIXES)
+        ):
+            self.cache.set(key, stream_url)
+        return stream_url
+
+    def _stream_key(self, film_id: str) -> str:
+        """Cache key of a film's stream URL, access differs between accounts"""
+        return f"stream/{self._account}/{film_id}"
+
+    def invalidate_stream(self, film_id: str):
+        """Forget the cached stream URL of a film, e.g. once the CDN stops serving it"""
+        if self.cache is not None:
+            self.cache.invalidate(self._stream_key(film_id))
+
+    def invalidate_streams(self):
+        """Forget all cached stream URLs of the logged in account"""
+        if self.cache is not None:
+            self.cache.invalidate_prefix(self._stream_key(""))
+
+    def _stream_available(self, stream_url: str) -> bool:
+        """Check the CDN still serves a stream URL, without downloading the stream"""
+        try:
+            response = self.session.head(
+                stream_url, allow_redirects=True, timeout=self.STREAM_CHECK_TIMEOUT
+            )
+        except requests.RequestException:
+            return False
+        return response.status_code < 400
+
+    def _fetch_stream_url(self, film_id: str) -> str:
         """Get stream URL for a film by parsing the film page"""
         # Note: Login is handled by the session manager, not here
         # This method assumes the session is already authenticated
@@ -310,21 +643,16 @@ class DAFilmsAPI:
                 player_response = self.session.get(player_url, headers=headers)
 
                 if player_response.status_code == 200:
-                    # Save for debugging
-                    with open(f"/tmp/dafilms_player_{film_id}.json", "w", encoding="utf-8") as f:
-                        f.write(player_response.text)
-
-                    # Debug logging
-                    import logging
-
-                    logging.info(f"DAFilms API: Player response status 200 for film {film_id}")
+                    if _log.isEnabledFor(logging.INFO):
+                        _log.info(f"DAFilms API: Player response status 200 for film {film_id}")
 
                     # Try to parse as JSON
                     try:
-                        player_data = player_response.json()
-                        logging.info(
-                            f"DAFilms API: Successfully parsed player data for film {film_id}"
-                        )
+                        player_data = _json_loads(player_response.content)
+                        if _log.isEnabledFor(logging.INFO):
+                            _log.info(
+                                f"DAFilms API: Successfully parsed player data for film {film_id}"
+                            )
 
                         # Extract HTML snippet containing player configuration
                         if (
@@ -335,26 +663,22 @@ class DAFilmsAPI:
                             html = player_data["snippets"]["#film-player-container"]
 
                             # Extract the sources array using the working approach from extract_streams.py
-                            sources_match = re.search(
-                                r"sources\s*=\s*\[([^\]]+)\]", html, re.DOTALL
-                            )
+                            sources_match = _SOURCES_RE.search(html)
                             if sources_match:
                                 sources_str = sources_match.group(1)
 
                                 # Extract individual source objects - handle escaped quotes
-                                source_objects = re.findall(r"\{[^}]+\}", sources_str)
+                                source_objects = _SOURCE_OBJ_RE.findall(sources_str)
 
                                 streams = []
                                 for i, source_obj in enumerate(source_objects):
                                     # Extract URL - handle escaped quotes and backslashes
-                                    url_match = re.search(r'"src"\s*:\s*"([^"]+)"', source_obj)
+                                    url_match = _SRC_RE.search(source_obj)
                                     if url_match:
                                         url = url_match.group(1).replace("\\/", "/")
 
                                         # Extract label
-                                        label_match = re.search(
-                                            r'"label"\s*:\s*"([^"]+)"', source_obj
-                                        )
+                                        label_match = _LABEL_RE.search(source_obj)
                                         label = (
                                             label_match.group(1)
                                             if label_match
@@ -365,19 +689,15 @@ class DAFilmsAPI:
                                             {
                                                 "url": url,
                                                 "label": label,
-                                                "quality": "HD" if "720p" in url else "SD",
+                                                "quality": "HD"
+                                                if _resolution(url) >= 720
+                                                else "SD",
                                             }
                                         )
 
                                 if streams:
-                                    # Return HD stream if available, otherwise the first stream
-                                    hd_stream = next(
-                                        (s for s in streams if s["quality"] == "HD"), None
-                                    )
-                                    if hd_stream:
-                                        return hd_stream["url"]
-                                    else:
-                                        return streams[0]["url"]
+                                    # Return the highest resolution stream, the first one on a tie
+                                    return max(streams, key=lambda s: _resolution(s["url"]))["url"]
 
                         # Fallback: look for common stream URL patterns in JSON
                         if "sources" in player_data:
@@ -389,37 +709,30 @@ class DAFilmsAPI:
                         if "url" in player_data:
                             return player_data["url"]
 
-                        # Recursively search for URLs
-                        for _key, value in player_data.items():
-                            if isinstance(value, str) and ("http" in value or "stream" in value):
-                                return value
-                            elif isinstance(value, (dict, list)):
-                                # Recursive search would go here
-                                pass
+                        # Search the whole structure for stream URLs
+                        url = _find_stream(player_data)
+                        if url:
+                            return url
 
                     except json.JSONDecodeError:
                         # Not JSON, might be HTML or other format
 
                         # Look for stream URLs in text - improved pattern
-                        sources_match = re.search(
-                            r"sources\s*=\s*\[([^\]]+)\]", player_response.text, re.DOTALL
-                        )
+                        sources_match = _SOURCES_RE.search(player_response.text)
                         if sources_match:
                             sources_str = sources_match.group(1)
 
                             # Extract URLs from the sources array - handle escaped characters
-                            url_matches = re.findall(r'https[^"\s]+\.mp4', sources_str)
+                            url_matches = _SOURCE_MP4_RE.findall(sources_str)
                             if url_matches:
-                                # Return the highest quality (first one, or one with 720p)
-                                hd_match = next((url for url in url_matches if "720p" in url), None)
-                                return hd_match if hd_match else url_matches[0]
+                                # Return the highest quality, the first one on a tie
+                                return max(url_matches, key=_resolution)
 
                         # Fallback: look for any MP4 URLs
-                        url_matches = re.findall(r'https?://[^"\'\s,&]+\.mp4', player_response.text)
+                        url_matches = _MP4_RE.findall(player_response.text)
                         if url_matches:
-                            # Return HD if available
-                            hd_match = next((url for url in url_matches if "720p" in url), None)
-                            return hd_match if hd_match else url_matches[0]
+                            # Return the highest quality, the first one on a tie
+                            return max(url_matches, key=_resolution)
                 elif player_response.status_code == 403:
                     return "REQUIRES_PURCHASE"
                 else:
@@ -427,9 +740,6 @@ class DAFilmsAPI:
             except Exception:
                 pass
 
-            # Debug logging
-            import logging
-
             raise DAFilmsAPIError(f"Could not extract stream URL for film {film_id}")
         except requests.RequestException as e:
             raise DAFilmsAPIError(
@@ -441,21 +751,21 @@ class DAFilmsAPI:
             ) from e
 
     def login(self, username: str, password: str) -> bool:
-        """Login to DAFilms.cz to access protected content"""
+        """Login to DAFilms.cz to access protected content, raises DAFilmsAPIError on network errors"""
         try:
             # First get the main page or a film page to extract CSRF token
             # The token is likely available on most pages
             main_page = self.session.get(f"{self.BASE_URL}/")
             main_page.raise_for_status()
 
-            soup = BeautifulSoup(main_page.text, "html.parser")
+            soup = _soup(main_page.text)
             csrf_token = soup.find("input", {"name": "_csrf_token"})
 
             # If not found on main page, try a film page
             if not csrf_token:
                 film_page = self.session.get(f"{self.BASE_URL}/film")
                 film_page.raise_for_status()
-                soup = BeautifulSoup(film_page.text, "html.parser")
+                soup = _soup(film_page.text)
                 csrf_token = soup.find("input", {"name": "_csrf_token"})
 
             if not csrf_token:
@@ -494,23 +804,31 @@ class DAFilmsAPI:
             if login_response.status_code == 200:
                 # Check if we got a redirect or if we're now logged in
                 # Look for logout link or user info in the response
-                response_text = login_response.text
-                if "Odhlásit" in response_text or "logout" in response_text:
+                login_state = _login_state(login_response.text)
+                if login_state:
                     self._logged_in = True
+                    self._account = username
                     return True
-                elif "Přihlásit" in response_text or "login" in response_text:
+                elif login_state is False:
                     return False
+                # The remember me cookie is only issued on a successful login
+                elif self.REMEMBER_ME_COOKIE in self.session.cookies:
+                    self._logged_in = True
+                    self._account = username
+                    return True
                 else:
-                    # Check if we can access a protected resource
-                    test_response = self.session.get(f"{self.BASE_URL}/film")
+                    # Check if we can access a protected resource, without downloading it
+                    test_response = self.session.head(f"{self.BASE_URL}/film", allow_redirects=True)
                     if test_response.status_code == 200:
                         self._logged_in = True
+                        self._account = username
                         return True
 
             return False
 
-        except requests.RequestException:
-            return False
+        except requests.RequestException as e:
+            # Not a rejected login, the caller should keep the credentials
+            raise DAFilmsAPIError(f"Network error logging in: {str(e)}") from e
 
     def _ensure_logged_in(self) -> bool:
         """Ensure we're logged in before accessing protected content"""
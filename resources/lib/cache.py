@@ -0,0 +1,61 @@
+"""
+Persistent cache for DAFilms.cz Kodi addon
+Stores scraped film data in SQLite so repeated directory opens skip the network
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+
+class DAFilmsCache:
+    """SQLite-backed cache of JSON payloads, each stamped with its sync time"""
+
+    def __init__(self, path: str, max_age: int | None = None):
+        """Open the cache at path, dropping entries synced more than max_age seconds ago"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Shared by the thumbnail fetch threads, so guard it with a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, payload TEXT NOT NULL, synced_at INTEGER NOT NULL)"
+            )
+            # Entries past every TTL are never read again, keep the file from growing
+            if max_age is not None:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE synced_at <= ?", (int(time.time()) - max_age,)
+                )
+
+    def get(self, key: str, ttl: int) -> Any | None:
+        """Get cached payload synced within the last ttl seconds, None if missing or stale"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM cache WHERE key = ? AND synced_at > ?",
+                (key, int(time.time()) - ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, payload: Any):
+        """Store payload under key, replacing any previous entry"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, payload, synced_at) VALUES (?, ?, ?)",
+                (key, json.dumps(payload), int(time.time())),
+            )
+
+    def invalidate(self, key: str):
+        """Drop the cached entry for key"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def invalidate_prefix(self, prefix: str):
+        """Drop every cached entry whose key starts with prefix"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            )
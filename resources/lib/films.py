@@ -1,15 +1,59 @@
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import xbmcgui
 import xbmcplugin
 
 from resources.lib.api import DAFilmsAPI, FilmDetails
 from resources.lib.session import get_session
-from resources.lib.utils import add_directory_item, get_url
+from resources.lib.utils import add_directory_item, get_play_url
 
 if len(sys.argv) > 1:
     _handle = int(sys.argv[1])
 
+# Rich metadata shared by all films of a category (film object only has basic fields)
+FILM_INFO = {
+    "plot": "DAFilms.cz dokumentární film",
+    "genre": "Documentary",
+    "mediatype": "movie",
+}
+_SUBSCRIPTION_INFO = {
+    "plot": "DAFilms.cz dokumentární film pro předplatitele",
+    "genre": "Documentary",
+    "mediatype": "movie",
+}
+_PURCHASED_INFO = {
+    "plot": "DAFilms.cz zakoupený film",
+    "genre": "Documentary",
+    "mediatype": "movie",
+}
+
+
+def add_film_items(films, base_info, thumbs=None):
+    """Add playable film items to the directory in a single call"""
+    if thumbs is None:
+        thumbs = [film.thumb for film in films]
+
+    items = []
+    # Bind names used for every film as locals
+    list_item_class = xbmcgui.ListItem
+    play_url = get_play_url
+    add_item = items.append
+
+    for film, thumb in zip(films, thumbs, strict=True):
+        title = film.title
+        list_item = list_item_class(label=title)
+        if thumb:
+            list_item.setArt({"thumb": thumb})
+        list_item.setInfo("video", {**base_info, "title": title})
+
+        # Resolved by play_film through setResolvedUrl
+        list_item.setProperty("IsPlayable", "true")
+
+        add_item((play_url(film.id, title), list_item, False))
+
+    xbmcplugin.addDirectoryItems(_handle, items, len(items))
+
 
 def list_newest_films(label):
     """List newest films"""
@@ -30,21 +74,7 @@ def list_newest_films(label):
     films = api.get_newest_films(limit=20)
 
     if films:
-        for film in films:
-            list_item = xbmcgui.ListItem(label=film.title)
-            list_item.setArt({"thumb": film.thumb})
-
-            # Set rich metadata (film object only has basic fields)
-            video_info = {
-                "title": film.title,
-                "plot": "DAFilms.cz dokumentární film",
-                "genre": "Documentary",
-                "mediatype": "movie",
-            }
-            list_item.setInfo("video", video_info)
-
-            url = get_url(action="play_film", film_id=film.id, title=film.title)
-            xbmcplugin.addDirectoryItem(_handle, url, list_item, False)
+        add_film_items(films, FILM_INFO)
 
     xbmcplugin.endOfDirectory(_handle, cacheToDisc=True)
 
@@ -68,20 +98,7 @@ def list_all_films(label):
     films = api.get_all_films(limit=50)
 
     if films:
-        for film in films:
-            list_item = xbmcgui.ListItem(label=film.title)
-            list_item.setArt({"thumb": film.thumb})
-            # Set rich metadata (film object only has basic fields)
-            video_info = {
-                "title": film.title,
-                "plot": "DAFilms.cz dokumentární film",
-                "genre": "Documentary",
-                "mediatype": "movie",
-            }
-            list_item.setInfo("video", video_info)
-
-            url = get_url(action="play_film", film_id=film.id, title=film.title)
-            xbmcplugin.addDirectoryItem(_handle, url, list_item, False)
+        add_film_items(films, FILM_INFO)
 
     xbmcplugin.endOfDirectory(_handle, cacheToDisc=True)
 
@@ -105,24 +122,20 @@ def list_subscription_films(label):
     films = api.get_subscription_films(limit=50)
 
     if films:
-        for film in films:
-            list_item = xbmcgui.ListItem(label=film.title)
-            list_item.setArt({"thumb": film.thumb})
-            # Set rich metadata (film object only has basic fields)
-            video_info = {
-                "title": film.title,
-                "plot": "DAFilms.cz dokumentární film pro předplatitele",
-                "genre": "Documentary",
-                "mediatype": "movie",
-            }
-            list_item.setInfo("video", video_info)
-
-            url = get_url(action="play_film", film_id=film.id, title=film.title)
-            xbmcplugin.addDirectoryItem(_handle, url, list_item, False)
+        add_film_items(films, _SUBSCRIPTION_INFO)
 
     xbmcplugin.endOfDirectory(_handle, cacheToDisc=True)
 
 
+def _get_thumb(api, film_id):
+    """Get film thumbnail from its details, None if they can't be fetched"""
+    try:
+        return api.get_film_details(film_id).get("thumb")
+    except Exception:
+        # If we can't get details, proceed without thumbnail
+        return None
+
+
 def list_purchased_films(label):
     """List films that the user has purchased"""
     xbmcplugin.setPluginCategory(_handle, label)
@@ -143,28 +156,11 @@ def list_purchased_films(label):
         films = api.get_purchased_films()
 
         if films:
-            for film in films:
-                list_item = xbmcgui.ListItem(label=film.title)
-                # Try to fetch film details to get thumbnail
-                try:
-                    film_details = api.get_film_details(film.id)
-                    if film_details.get("thumb"):
-                        list_item.setArt({"thumb": film_details["thumb"]})
-                except Exception:
-                    # If we can't get details, proceed without thumbnail
-                    pass
-
-                # Set rich metadata
-                video_info = {
-                    "title": film.title,
-                    "plot": "DAFilms.cz zakoupený film",
-                    "genre": "Documentary",
-                    "mediatype": "movie",
-                }
-                list_item.setInfo("video", video_info)
-
-                url = get_url(action="play_film", film_id=film.id, title=film.title)
-                xbmcplugin.addDirectoryItem(_handle, url, list_item, False)
+            # Film details are only needed for thumbnails, fetch them all in parallel
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                thumbs = list(executor.map(lambda film: _get_thumb(api, film.id), films))
+
+            add_film_items(films, _PURCHASED_INFO, thumbs)
         else:
             # No purchased films found
             list_item = xbmcgui.ListItem(label="Žádné zakoupené filmy")
@@ -4,9 +4,8 @@ import xbmc
 import xbmcgui
 import xbmcplugin
 
-from resources.lib.api import DAFilmsAPI
+from resources.lib.films import FILM_INFO, add_film_items
 from resources.lib.session import get_session
-from resources.lib.utils import get_url
 
 if len(sys.argv) > 1:
     _handle = int(sys.argv[1])
@@ -33,25 +32,13 @@ def perform_search(query, label):
         xbmcplugin.setPluginCategory(_handle, f"Výsledky hledání: {query}")
 
         try:
-            api = DAFilmsAPI()
+            # Search works without an account, so skip the login requests
+            api = get_session().get_api(ensure_login=False)
             results = api.search_films(query)
 
             if results:
-                for film in results[:20]:  # Limit to 20 results for performance
-                    list_item = xbmcgui.ListItem(label=film.title)
-                    list_item.setArt({"thumb": film.thumb})
-
-                    # Set rich metadata (film object only has basic fields)
-                    video_info = {
-                        "title": film.title,
-                        "plot": "DAFilms.cz dokumentární film",
-                        "genre": "Documentary",
-                        "mediatype": "movie",
-                    }
-                    list_item.setInfo("video", video_info)
-
-                    url = get_url(action="play_film", film_id=film.id, title=film.title)
-                    xbmcplugin.addDirectoryItem(_handle, url, list_item, False)
+                # Limit to 20 results for performance
+                add_film_items(results[:20], FILM_INFO)
             else:
                 # No results found
                 list_item = xbmcgui.ListItem(label="Nenalezeny žádné filmy")
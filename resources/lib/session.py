@@ -3,25 +3,34 @@ Session management for DAFilms.cz Kodi addon
 Handles authentication, credentials storage, and session persistence
 """
 
-import requests
+import threading
+
 import xbmcaddon
 import xbmcgui
+import xbmcvfs
+
+from resources.lib.api import DAFilmsAPI, DAFilmsAPIError
+from resources.lib.cache import DAFilmsCache
 
-from resources.lib.api import DAFilmsAPI
+CACHE_PATH = "special://profile/addon_data/plugin.video.dafilms.cz/cache.db"
 
 
 class DAFilmsSession:
     """Singleton session manager for DAFilms.cz API"""
 
     _instance = None
+    _lock = threading.Lock()
     _api = None
     _addon = None
 
     def __new__(cls):
-        """Singleton pattern - ensure only one instance exists"""
+        """Singleton pattern - ensure only one instance exists, even across threads"""
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialize()
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialize()
+                    cls._instance = instance
         return cls._instance
 
     def _initialize(self):
@@ -32,13 +41,32 @@ class DAFilmsSession:
             # This can happen during development/testing
             self._addon = None
 
-        self._api = DAFilmsAPI()
-        self._logged_in = False
+        # The API client with its connection pool is created on first use
+        self._api = None
+        # Guards creating the client and logging in, so concurrent callers share one login
+        self._api_lock = threading.Lock()
+
+    def _create_api(self) -> DAFilmsAPI:
+        """Create the API client backed by the on-disk cache"""
+        try:
+            # Film details are kept the longest, anything older is stale for every reader
+            cache = DAFilmsCache(
+                xbmcvfs.translatePath(CACHE_PATH), max_age=DAFilmsAPI.FILM_DETAILS_TTL
+            )
+        except Exception:
+            # Work without the cache rather than fail if the profile is not writable
+            cache = None
 
-    def get_api(self) -> DAFilmsAPI:
-        """Get the API instance, ensuring we're logged in"""
-        self._ensure_logged_in()
-        return self._api
+        return DAFilmsAPI(cache=cache)
+
+    def get_api(self, ensure_login: bool = True) -> DAFilmsAPI:
+        """Get the API instance, logging in first unless ensure_login is False"""
+        with self._api_lock:
+            if self._api is None:
+                self._api = self._create_api()
+            if ensure_login:
+                self._ensure_logged_in()
+            return self._api
 
     def _ensure_logged_in(self) -> bool:
         """Ensure we're logged in, attempt login if needed"""
@@ -53,9 +81,14 @@ class DAFilmsSession:
         password = self._addon.getSetting("password")
 
         if username and password:
-            if self._api.login(username, password):
+            try:
+                logged_in = self._api.login(username, password)
+            except DAFilmsAPIError:
+                # Network error, the credentials may well be right
+                return False
+
+            if logged_in:
                 self._api._logged_in = True
-                self._logged_in = True
                 return True
             else:
                 # Clear credentials if login failed
@@ -87,10 +120,13 @@ class DAFilmsSession:
 
     def logout(self):
         """Logout from DAFilms.cz"""
-        self._api._logged_in = False
-        self._logged_in = False
-        # Clear session cookies by creating a new session
-        self._api.session = requests.Session()
+        if self._api is not None:
+            # Stream URLs were resolved for the logged in account
+            self._api.invalidate_streams()
+            self._api._logged_in = False
+            self._api._account = None
+            # Clear session cookies, keeping the pooled connections for the next login
+            self._api.session.cookies.clear()
 
         # Clear stored credentials if addon is available
         if self._addon:
@@ -102,7 +138,8 @@ class DAFilmsSession:
 
     def is_logged_in(self) -> bool:
         """Check if user is logged in"""
-        return self._logged_in and self._api._logged_in
+        # The API client tracks the login state, there is none before it is created
+        return self._api is not None and self._api._logged_in
 
 
 def get_session() -> DAFilmsSession:
@@ -1,18 +1,25 @@
 import sys
+from functools import cache
+from urllib.parse import parse_qsl, quote_plus, urlencode
 
-import xbmc
+import xbmcaddon
 import xbmcgui
 import xbmcplugin
 
-try:
-    from urlparse import parse_qsl, urlencode  # type: ignore
-except ImportError:
-    from urllib.parse import parse_qsl, urlencode  # type: ignore
+# Plugin base URL, Kodi passes it as the first argument
+_PLUGIN_BASE = sys.argv[0] if sys.argv else ""
 
 
 def get_url(**kwargs):
     """Create plugin URL with parameters"""
-    return f"{sys.argv[0]}?{urlencode(kwargs)}"
+    return f"{_PLUGIN_BASE}?{urlencode(kwargs)}"
+
+
+def get_play_url(film_id, title):
+    """Create plugin URL playing a film, same as get_url(action="play_film", ...)"""
+    return (
+        f"{_PLUGIN_BASE}?action=play_film&film_id={quote_plus(film_id)}&title={quote_plus(title)}"
+    )
 
 
 def add_directory_item(handle, label, url, is_folder=True, **kwargs):
@@ -32,12 +39,15 @@ def add_directory_item(handle, label, url, is_folder=True, **kwargs):
 
 def show_notification(message, title="DAFilms.cz", icon=xbmcgui.NOTIFICATION_INFO):
     """Show Kodi notification"""
-    xbmc.executebuiltin(f'Notification("{title}", "{message}", 5000, "{icon}")')
+    xbmcgui.Dialog().notification(title, message, icon, 5000)
+
+
+@cache
+def _get_addon():
+    """Addon instance, created once per plugin invocation"""
+    return xbmcaddon.Addon()
 
 
 def get_addon_setting(setting_id):
     """Get addon setting value"""
-    import xbmcaddon
-
-    addon = xbmcaddon.Addon()
-    return addon.getSetting(setting_id)
+    return _get_addon().getSetting(setting_id)
@@ -0,0 +1,193 @@
+import json
+
+import pytest
+import requests
+
+from resources.lib import api as api_module
+from resources.lib.api import DAFilmsAPI, DAFilmsAPIError, FilmDetails
+from resources.lib.cache import DAFilmsCache
+
+LOGIN_FORM = '<html><body><form><input name="_csrf_token" value="token"></form></body></html>'
+
+LISTING_PAGE = """<html><body><ul>
+<li class="menu-item"><a class="ui-movie-card__link" href="/film/0-menu">Menu</a></li>
+<li data-film-item="true" class="ui-movie-card">
+  <a class="ui-movie-card__link extra" href="/film/1-first/detail"
+     style="background-image: url('https://dafilms.cz/media/1.jpg')">
+    <span class="ui-movie-card__link--title">  First film  </span>
+  </a>
+</li>
+<li data-film-item="true"><div class="ui-movie-card__title">No link</div></li>
+<li data-film-item="true">
+  <a class="ui-movie-card__link" href="https://dafilms.cz/film/2-second">
+    <img src="https://dafilms.cz/media/2.jpg">
+  </a>
+  <h3 class="ui-movie-card__title">Second film</h3>
+</li>
+<li data-film-item="true">
+  <a class="ui-movie-card__link" href="/film/3-third"></a>
+</li>
+<li data-film-item="true">
+  <a class="ui-movie-card__link" href="/film/4-fourth">
+    <span class="ui-movie-card__link--title">Fourth film</span>
+  </a>
+</li>
+</ul></body></html>"""
+
+LISTING_FILMS = [
+    FilmDetails(
+        "1-first",
+        "First film",
+        "https://dafilms.cz/film/1-first/detail",
+        "https://dafilms.cz/media/1.jpg",
+    ),
+    FilmDetails(
+        "2-second",
+        "Second film",
+        "https://dafilms.cz/film/2-second",
+        "https://dafilms.cz/media/2.jpg",
+    ),
+    FilmDetails("3-third", "Unknown Title", "https://dafilms.cz/film/3-third", None),
+    FilmDetails("4-fourth", "Fourth film", "https://dafilms.cz/film/4-fourth", None),
+]
+
+
+def film_page(json_ld):
+    """Film page HTML carrying the given JSON-LD script"""
+    return f'<html><head><script type="application/ld+json">{json_ld}</script></head></html>'
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+
+@pytest.fixture
+def api():
+    """Fixture that provides a DAFilmsAPI instance without a cache"""
+    return DAFilmsAPI()
+
+
+def test_login_network_error(api, monkeypatch):
+    """Test a network error on login raises instead of reporting rejected credentials"""
+
+    def get(url, **kwargs):
+        raise requests.ConnectionError("connection refused")
+
+    monkeypatch.setattr(api.session, "get", get)
+
+    with pytest.raises(DAFilmsAPIError):
+        api.login("user@example.com", "secret")
+    assert not api._logged_in
+
+
+def test_login_rejected(api, monkeypatch):
+    """Test rejected credentials make login return False"""
+    monkeypatch.setattr(api.session, "get", lambda url, **kwargs: FakeResponse(LOGIN_FORM))
+    monkeypatch.setattr(
+        api.session, "post", lambda url, **kwargs: FakeResponse("<a href='/login'>Přihlásit</a>")
+    )
+
+    assert api.login("user@example.com", "wrong") is False
+    assert not api._logged_in
+
+
+def test_film_details_keeps_escaped_newlines(api, monkeypatch):
+    """Test text from valid JSON-LD comes back as decoded, paragraph breaks included"""
+    movie = {
+        "@type": "Movie",
+        "name": "Film",
+        "description": "First paragraph.\nSecond paragraph.\tEnd.",
+        "director": [{"name": "Director"}],
+        "actor": [{"name": "Actor"}],
+        "image": "https://dafilms.cz/media/film.jpg",
+    }
+    page = film_page(json.dumps(movie))
+    monkeypatch.setattr(api.session, "get", lambda url, **kwargs: FakeResponse(page))
+
+    assert api.get_film_details("1-film") == {
+        "title": "Film",
+        "plot": "First paragraph.\nSecond paragraph.\tEnd.",
+        "director": "Director",
+        "cast": ["Actor"],
+        "thumb": "https://dafilms.cz/media/film.jpg",
+    }
+
+
+def test_film_details_cleans_raw_control_characters(api, monkeypatch):
+    """Test raw control characters inside JSON-LD strings are cleaned up"""
+    page = film_page('{"@type": "Movie", "name": "Film\u00a0title", "description": "One\ttwo\n"}')
+    monkeypatch.setattr(api.session, "get", lambda url, **kwargs: FakeResponse(page))
+
+    details = api.get_film_details("2-film")
+    assert details["title"] == "Film title"
+    assert details["plot"] == "Onetwo"
+
+
+def test_stream_urls_cached_per_account(tmp_path, monkeypatch):
+    """Test a cached stream URL is reused only for the account that resolved it"""
+    api = DAFilmsAPI(cache=DAFilmsCache(str(tmp_path / "cache.db")))
+    fetched = []
+
+    def fetch(film_id):
+        fetched.append((api._account, film_id))
+        return f"https://cdn/{api._account}/{film_id}.mp4"
+
+    monkeypatch.setattr(api, "_fetch_stream_url", fetch)
+    monkeypatch.setattr(api, "_stream_available", lambda stream_url: True)
+
+    api._account = "a@example.com"
+    assert api.get_stream_url("1") == "https://cdn/a@example.com/1.mp4"
+    assert api.get_stream_url("1") == "https://cdn/a@example.com/1.mp4"
+    api._account = "b@example.com"
+    assert api.get_stream_url("1") == "https://cdn/b@example.com/1.mp4"
+    assert fetched == [("a@example.com", "1"), ("b@example.com", "1")]
+
+
+def test_unavailable_cached_stream_resolved_again(tmp_path, monkeypatch):
+    """Test a cached stream URL the CDN no longer serves is replaced by a fresh one"""
+    api = DAFilmsAPI(cache=DAFilmsCache(str(tmp_path / "cache.db")))
+    urls = iter(("https://cdn/old.mp4", "https://cdn/new.mp4"))
+    monkeypatch.setattr(api, "_fetch_stream_url", lambda film_id: next(urls))
+    monkeypatch.setattr(api, "_stream_available", lambda stream_url: False)
+
+    assert api.get_stream_url("1") == "https://cdn/old.mp4"
+    assert api.get_stream_url("1") == "https://cdn/new.mp4"
+
+
+@pytest.mark.parametrize("parser", ["selectolax", "lxml", "bs4"])
+def test_listing_parsers_agree(api, monkeypatch, parser):
+    """Test every listing parser gives the same films, cut off at the limit"""
+    if parser == "selectolax" and api_module.HTMLParser is None:
+        pytest.skip("selectolax is not installed")
+    if parser == "lxml" and api_module.etree is None:
+        pytest.skip("lxml is not installed")
+    if parser != "selectolax":
+        monkeypatch.setattr(api_module, "HTMLParser", None)
+    if parser == "bs4":
+        monkeypatch.setattr(api_module, "etree", None)
+
+    assert api._parse_films_from_page(LISTING_PAGE) == LISTING_FILMS
+    assert api._parse_films_from_page(LISTING_PAGE, limit=2) == LISTING_FILMS[:2]
+
+
+def test_listing_lxml_error_falls_back_to_bs4(api, monkeypatch):
+    """Test cards lxml could not parse are read by BeautifulSoup, without repeating any"""
+    if api_module.etree is None:
+        pytest.skip("lxml is not installed")
+    monkeypatch.setattr(api_module, "HTMLParser", None)
+
+    def iter_cards(html_content):
+        yield next(api_module._iter_film_cards_soup(html_content))
+        raise api_module.etree.ParserError("broken page")
+
+    monkeypatch.setattr(api_module, "_iter_film_cards_lxml", iter_cards)
+
+    assert api._parse_films_from_page(LISTING_PAGE) == LISTING_FILMS
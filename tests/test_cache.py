@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from resources.lib.cache import DAFilmsCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fixture that freezes time.time, advance it by assigning to clock.now"""
+
+    class Clock:
+        now = 1_700_000_000.0
+
+    monkeypatch.setattr(time, "time", lambda: Clock.now)
+    return Clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    """Fixture that provides an empty cache in a temporary directory"""
+    return DAFilmsCache(str(tmp_path / "profile" / "cache.db"))
+
+
+def test_json_round_trip(cache):
+    """Test payloads come back as the same JSON data"""
+    payload = {"title": "Film č. 1", "cast": ["A", "B"], "year": 2020, "thumb": None}
+    cache.set("film/1", payload)
+
+    assert cache.get("film/1", ttl=60) == payload
+    assert cache.get("film/2", ttl=60) is None
+
+
+def test_ttl_boundary(cache, clock):
+    """Test an entry is fresh until exactly ttl seconds after it was synced"""
+    cache.set("stream/1", "https://cdn/film.mp4")
+
+    clock.now += 59
+    assert cache.get("stream/1", ttl=60) == "https://cdn/film.mp4"
+
+    clock.now += 1
+    assert cache.get("stream/1", ttl=60) is None
+
+
+def test_set_replaces_entry(cache, clock):
+    """Test storing a key again replaces the payload and its sync time"""
+    cache.set("listing", [1])
+    clock.now += 50
+    cache.set("listing", [2])
+    clock.now += 50
+
+    assert cache.get("listing", ttl=60) == [2]
+
+
+def test_invalidate(cache):
+    """Test an invalidated entry is gone while others stay"""
+    cache.set("stream/1", "https://cdn/1.mp4")
+    cache.set("stream/2", "https://cdn/2.mp4")
+    cache.invalidate("stream/1")
+    cache.invalidate("stream/3")
+
+    assert cache.get("stream/1", ttl=60) is None
+    assert cache.get("stream/2", ttl=60) == "https://cdn/2.mp4"
+
+
+def test_expired_entries_purged_on_open(tmp_path, clock):
+    """Test opening the cache deletes entries older than max_age"""
+    path = str(tmp_path / "cache.db")
+    cache = DAFilmsCache(path)
+    cache.set("old", "a")
+    clock.now += 100
+    cache.set("new", "b")
+
+    clock.now += 60
+    DAFilmsCache(path, max_age=120)
+
+    rows = cache._conn.execute("SELECT key FROM cache").fetchall()
+    assert rows == [("new",)]
+
+
+def test_invalidate_prefix(cache):
+    """Test only the entries under a key prefix are dropped"""
+    cache.set("stream/a@example.com/1", "https://cdn/1.mp4")
+    cache.set("stream/a@example.com/2", "https://cdn/2.mp4")
+    cache.set("stream/b@example.com/1", "https://cdn/3.mp4")
+    cache.invalidate_prefix("stream/a@example.com/")
+
+    assert cache.get("stream/a@example.com/1", ttl=60) is None
+    assert cache.get("stream/a@example.com/2", ttl=60) is None
+    assert cache.get("stream/b@example.com/1", ttl=60) == "https://cdn/3.mp4"
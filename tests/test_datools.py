@@ -0,0 +1,51 @@
+import os
+import time
+import zipfile
+
+import datools
+
+# PNG signature followed by filler, large enough that only the suffix keeps it stored
+PNG_DATA = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 8
+
+
+def write_file(path, data, mtime=None):
+    """Write data to path, optionally setting its modification time"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_write_zip(tmp_path):
+    """Test the hand-packed archive reads back with zipfile, for every entry kind"""
+    src = tmp_path / "src"
+    files = {
+        "plugin/addon.xml": (b"<addon/>", 1_700_000_000),
+        "plugin/icon.png": (PNG_DATA, None),
+        "plugin/resources/lib/api.py": (b"import json\n" * 200, None),
+        "plugin/old.txt": (b"x" * 1000, 0),
+    }
+    entries = [
+        datools._zip_entry(write_file(src / arcname, data, mtime), arcname, 3)
+        for arcname, (data, mtime) in files.items()
+    ]
+    zip_path = tmp_path / "addon.zip"
+    datools._write_zip(str(zip_path), entries)
+
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == list(files)
+        for arcname, (data, _) in files.items():
+            assert zf.read(arcname) == data
+
+        infos = {info.filename: info for info in zf.infolist()}
+
+    # Tiny files and PNGs are stored, the rest deflated
+    assert infos["plugin/addon.xml"].compress_type == zipfile.ZIP_STORED
+    assert infos["plugin/icon.png"].compress_type == zipfile.ZIP_STORED
+    assert infos["plugin/resources/lib/api.py"].compress_type == zipfile.ZIP_DEFLATED
+    assert infos["plugin/old.txt"].compress_type == zipfile.ZIP_DEFLATED
+    # Timestamps are kept in local time, those before the DOS epoch are clamped to it
+    assert infos["plugin/addon.xml"].date_time == time.localtime(1_700_000_000)[:6]
+    assert infos["plugin/old.txt"].date_time == (1980, 1, 1, 0, 0, 0)
@@ -5,7 +5,7 @@ import json
 from bs4 import BeautifulSoup
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def api():
     """Fixture that provides an authenticated DAFilmsAPI instance"""
     email = os.environ.get("DAFILMS_EMAIL")
@@ -31,7 +31,6 @@ def test_stream_extraction(api):
 
 def test_search(api):
     """Test search functionality"""
-    api = DAFilmsAPI()
     results = api.search_films("Karel")
     expected_details = FilmDetails(
         id="10919-karel-ja-a-ty",